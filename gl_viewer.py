@@ -2,7 +2,9 @@
 # gl_viewer.py — Looking Glass python viewer 
 #
 #
-# - Draws LG frame using a textured quad shader (RGB/BGRA upload).
+# - Draws LG frame using a textured quad shader (raw BGRA upload via PBO ring,
+#   channel order fixed up in the fragment shader; 24-bit frames are widened
+#   to BGRA on the way in).
 # - If health_fn is provided and returns anything other than "ok",
 #   it draws a semi-transparent black full-screen overlay with text:
 #       -- waiting for signal --
@@ -15,6 +17,8 @@ import glfw
 import numpy as np
 from OpenGL import GL
 
+from lgmp_ring import FrameReader
+
 # ----------------------------------------------------------
 # Shaders
 # ----------------------------------------------------------
@@ -23,10 +27,23 @@ VERT_SRC_TEX = """
 in vec2 aPos; in vec2 aUV; out vec2 vUV;
 void main(){ vUV=aUV; gl_Position=vec4(aPos,0.0,1.0); }
 """
+# unit quad placed by uXYWH = (NDC center x, y, half-width, half-height)
+VERT_SRC_TXT = """
+#version 130
+in vec2 aPos; in vec2 aUV; out vec2 vUV; uniform vec4 uXYWH;
+void main(){ vUV=aUV; gl_Position=vec4(aPos*uXYWH.zw + uXYWH.xy,0.0,1.0); }
+"""
+# uSwizzle: channel order of the uploaded bytes (textures are always uploaded raw as GL_RGBA)
+SWIZZLE_RGBA, SWIZZLE_BGRA, SWIZZLE_BGR1 = 0, 1, 2
 FRAG_SRC_TEX = """
 #version 130
-in vec2 vUV; out vec4 FragColor; uniform sampler2D uTex;
-void main(){ FragColor = texture(uTex, vUV); }
+in vec2 vUV; out vec4 FragColor; uniform sampler2D uTex; uniform int uSwizzle;
+void main(){
+    vec4 c = texture(uTex, vUV);
+    if (uSwizzle == 1) c = c.bgra;
+    else if (uSwizzle == 2) c = vec4(c.bgr, 1.0);
+    FragColor = c;
+}
 """
 
 VERT_SRC_SOLID = """
@@ -48,21 +65,41 @@ def _compile_shader(kind, src):
         raise RuntimeError(GL.glGetShaderInfoLog(s).decode("utf-8", "ignore"))
     return s
 
-def _build_program(vs_src, fs_src):
+# fixed vertex layout shared by every program, bound before link
+ATTR_POS, ATTR_UV = 0, 1
+_ATTRIBS = {ATTR_POS: "aPos", ATTR_UV: "aUV"}
+
+# program -> {uniform name: location}, filled once after link
+_UNIFORM_LOCS = {}
+
+def _build_program(vs_src, fs_src, attribs=_ATTRIBS):
     vs = _compile_shader(GL.GL_VERTEX_SHADER, vs_src)
     fs = _compile_shader(GL.GL_FRAGMENT_SHADER, fs_src)
     p  = GL.glCreateProgram()
-    GL.glAttachShader(p, vs); GL.glAttachShader(p, fs); GL.glLinkProgram(p)
+    GL.glAttachShader(p, vs); GL.glAttachShader(p, fs)
+    for loc, name in attribs.items():
+        GL.glBindAttribLocation(p, loc, name)
+    GL.glLinkProgram(p)
     if GL.glGetProgramiv(p, GL.GL_LINK_STATUS) != GL.GL_TRUE:
         raise RuntimeError(GL.glGetProgramInfoLog(p).decode("utf-8", "ignore"))
     GL.glDeleteShader(vs); GL.glDeleteShader(fs)
+    locs = {}
+    for i in range(GL.glGetProgramiv(p, GL.GL_ACTIVE_UNIFORMS)):
+        name = GL.glGetActiveUniform(p, i)[0]
+        name = name.decode("utf-8", "ignore") if isinstance(name, bytes) else str(name)
+        locs[name] = GL.glGetUniformLocation(p, name)
+    _UNIFORM_LOCS[p] = locs
     return p
 
+def _uniform_loc(prog, name):
+    """Cached uniform location (-1 if the uniform is absent or optimized out)."""
+    return _UNIFORM_LOCS.get(prog, {}).get(name, -1)
+
 # ----------------------------------------------------------
 # Geometry helpers 
 # ----------------------------------------------------------
 def _make_quad(prog, flip_y=True):
-    """Full-screen quad with positions + UV """
+    """Full-screen quad with positions + UV (attribs at the fixed ATTR_POS/ATTR_UV slots)"""
     v0y, v1y = (1.0, 0.0) if flip_y else (0.0, 1.0)
     verts = np.array([
         -1,-1, 0.0, v0y,
@@ -84,15 +121,10 @@ def _make_quad(prog, flip_y=True):
     GL.glBufferData(GL.GL_ELEMENT_ARRAY_BUFFER, idx.nbytes, idx, GL.GL_STATIC_DRAW)
 
     stride = 4 * ctypes.sizeof(ctypes.c_float)
-    loc_pos = GL.glGetAttribLocation(prog, "aPos")
-    if loc_pos != -1:
-        GL.glEnableVertexAttribArray(loc_pos)
-        GL.glVertexAttribPointer(loc_pos, 2, GL.GL_FLOAT, GL.GL_FALSE, stride, ctypes.c_void_p(0))
-
-    loc_uv  = GL.glGetAttribLocation(prog, "aUV")
-    if loc_uv != -1:
-        GL.glEnableVertexAttribArray(loc_uv)
-        GL.glVertexAttribPointer(loc_uv, 2, GL.GL_FLOAT, GL.GL_FALSE, stride, ctypes.c_void_p(8))
+    GL.glEnableVertexAttribArray(ATTR_POS)
+    GL.glVertexAttribPointer(ATTR_POS, 2, GL.GL_FLOAT, GL.GL_FALSE, stride, ctypes.c_void_p(0))
+    GL.glEnableVertexAttribArray(ATTR_UV)
+    GL.glVertexAttribPointer(ATTR_UV,  2, GL.GL_FLOAT, GL.GL_FALSE, stride, ctypes.c_void_p(8))
 
     GL.glBindVertexArray(0)
     return vao, vbo, ebo
@@ -110,14 +142,113 @@ def _create_tex():
     GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
     return t
 
-def _upload_bgr(tex, w, h, data, bpp):
+def _alloc_frame_tex(tex, w, h):
+    """Allocate RGBA8 storage once; frames are then streamed with glTexSubImage2D.
+
+    Immutable storage needs GL 4.2 / ARB_texture_storage; older contexts get a
+    one-time glTexImage2D allocation instead.
+    """
+    GL.glBindTexture(GL.GL_TEXTURE_2D, tex)
+    try:
+        if not bool(GL.glTexStorage2D):
+            raise RuntimeError("glTexStorage2D unavailable")
+        GL.glTexStorage2D(GL.GL_TEXTURE_2D, 1, GL.GL_RGBA8, w, h)
+    except Exception:
+        GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, GL.GL_RGBA8, w, h, 0, GL.GL_RGBA, GL.GL_UNSIGNED_BYTE, None)
+    GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+
+def _create_pbo_ring(w, h, n=2):
+    """Persistently-mapped PBO ring of [pbo, (h,w,4) uint8 view, fence] staging slots.
+
+    Slots are BGRA and pre-filled with 0xFF so 24-bit frames only ever write
+    the colour bytes. fence is the sync object of the slot's last upload (None
+    until used). Falls back to a single client-memory slot (pbo=0).
+    """
+    size = w * h * 4
+    flags = GL.GL_MAP_WRITE_BIT | GL.GL_MAP_PERSISTENT_BIT | GL.GL_MAP_COHERENT_BIT
+    bufs = []
+    try:
+        ring = []
+        bufs = [int(b) for b in np.atleast_1d(GL.glGenBuffers(n))]
+        for p in bufs:
+            GL.glBindBuffer(GL.GL_PIXEL_UNPACK_BUFFER, p)
+            GL.glBufferStorage(GL.GL_PIXEL_UNPACK_BUFFER, size, None, flags)
+            ptr = GL.glMapBufferRange(GL.GL_PIXEL_UNPACK_BUFFER, 0, size, flags)
+            if not ptr:
+                raise RuntimeError("glMapBufferRange failed")
+            arr = np.ctypeslib.as_array(ctypes.cast(ptr, ctypes.POINTER(ctypes.c_uint8)), shape=(h, w, 4))
+            arr.fill(0xFF)
+            ring.append([p, arr, None])
+        return ring
+    except Exception as e:
+        print(f'[viewer] PBO ring unavailable, using client-memory upload: {e}', flush=True)
+        if bufs:
+            try: GL.glDeleteBuffers(len(bufs), bufs)  # also unmaps any that got mapped
+            except Exception: pass
+        return [[0, np.full((h, w, 4), 0xFF, dtype=np.uint8), None]]
+    finally:
+        GL.glBindBuffer(GL.GL_PIXEL_UNPACK_BUFFER, 0)
+
+def _create_frame_target(w, h, n=2):
+    """Frame texture with immutable (w,h) storage plus its PBO staging ring."""
+    tex = _create_tex()
+    _alloc_frame_tex(tex, w, h)
+    return tex, _create_pbo_ring(w, h, n)
+
+def _delete_frame_target(tex, ring):
+    for slot in ring:
+        if slot[2] is not None:
+            GL.glDeleteSync(slot[2]); slot[2] = None
+    bufs = [p for p, _, _ in ring if p]
+    if bufs:
+        GL.glDeleteBuffers(len(bufs), bufs)
+    GL.glDeleteTextures(1, [tex])
+
+def _create_overlay_target(w, h):
+    """Offscreen RGBA8 colour target used to cache the rasterized health overlay."""
+    tex = _create_tex()
+    GL.glBindTexture(GL.GL_TEXTURE_2D, tex)
+    GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, GL.GL_RGBA8, w, h, 0, GL.GL_RGBA, GL.GL_UNSIGNED_BYTE, None)
+    GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
+    fbo = GL.glGenFramebuffers(1)
+    GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, fbo)
+    GL.glFramebufferTexture2D(GL.GL_FRAMEBUFFER, GL.GL_COLOR_ATTACHMENT0, GL.GL_TEXTURE_2D, tex, 0)
+    GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, 0)
+    return fbo, tex
+
+def _delete_overlay_target(fbo, tex):
+    GL.glDeleteFramebuffers(1, [fbo])
+    GL.glDeleteTextures(1, [tex])
+
+def _upload_bgr_sub(tex, w, h, data, bpp, stage):
+    # stage: [pbo, view, fence] slot from _create_pbo_ring. 24-bit frames are widened to
+    # BGRA while copying so the driver never takes the unaligned 3-byte path.
+    # Bytes go up raw as GL_RGBA; draw with uSwizzle=SWIZZLE_BGR1.
+    # data may be tight bytes or a pitched (h, w*bpp) view (LGMPv6.frame_view): either way
+    # pitch-strip and widen happen in the single copy into the PBO.
+    buf, arr, fence = stage
+    if fence is not None:
+        # the mapping is persistent: the GPU may still be reading this slot's previous frame
+        GL.glClientWaitSync(fence, GL.GL_SYNC_FLUSH_COMMANDS_BIT, 1_000_000_000)
+        GL.glDeleteSync(fence); stage[2] = None
     GL.glBindTexture(GL.GL_TEXTURE_2D, tex)
-    GL.glPixelStorei(GL.GL_UNPACK_ALIGNMENT, 1)
+    GL.glPixelStorei(GL.GL_UNPACK_ALIGNMENT, 4)
+    src = data if isinstance(data, np.ndarray) else np.frombuffer(data, dtype=np.uint8)
+    src = src.reshape(h, w, bpp)
     if bpp == 3:
-        GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, GL.GL_RGB, w, h, 0, GL.GL_BGR,  GL.GL_UNSIGNED_BYTE, data)
+        arr[:, :, :3] = src
+        pixels = arr
+    elif buf:
+        arr[:] = src
     else:
-        GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, GL.GL_RGBA, w, h, 0, GL.GL_BGRA, GL.GL_UNSIGNED_BYTE, data)
-        GL.glTexParameteri(GL.GL_TEXTURE_2D, GL.GL_TEXTURE_SWIZZLE_A, GL.GL_ONE)
+        pixels = np.ascontiguousarray(src)
+    if buf:
+        GL.glBindBuffer(GL.GL_PIXEL_UNPACK_BUFFER, buf)
+        pixels = ctypes.c_void_p(0)
+    GL.glTexSubImage2D(GL.GL_TEXTURE_2D, 0, 0, 0, w, h, GL.GL_RGBA, GL.GL_UNSIGNED_BYTE, pixels)
+    if buf:
+        stage[2] = GL.glFenceSync(GL.GL_SYNC_GPU_COMMANDS_COMPLETE, 0)
+        GL.glBindBuffer(GL.GL_PIXEL_UNPACK_BUFFER, 0)
     GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
 
 # ----------------------------------------------------------
@@ -134,57 +265,63 @@ _FONT = {
  'U':[0x11,0x11,0x11,0x11,0x0F],'W':[0x11,0x11,0x15,0x1B,0x11],
 }
 
+# baked once: (len(_FONT), 7, 6) bitmap atlas, column bytes unpacked to rows;
+# each glyph carries a trailing 0 column so glyphs concatenate with 1px spacing
+_FONT_INDEX = {ch: i for i, ch in enumerate(_FONT)}
+_FONT_BITS = np.unpackbits(np.array(list(_FONT.values()), dtype=np.uint8)[:, :, None],
+                           axis=2, bitorder='little')[:, :, :7].transpose(0, 2, 1)
+_FONT_BITS = np.ascontiguousarray(np.pad(_FONT_BITS, ((0, 0), (0, 0), (0, 1))))
+
 def _text_to_tex(msg, scale=3):
     # uppercase + monospace
     msg = msg.upper()
-    cols = 0
-    for ch in msg:
-        cols += 6  # 5px glyph + 1px space
-    cols -= 1
+    cols = len(msg) * 6 - 1  # 5px glyph + 1px space
     w = cols*scale + 8
     h = 7*scale + 8
+    blank = _FONT_INDEX[' ']
+    idxs = np.fromiter((_FONT_INDEX.get(ch, blank) for ch in msg), dtype=np.intp, count=len(msg))
+    mask = _FONT_BITS[idxs].transpose(1, 0, 2).reshape(7, -1)[:, :cols]
+    # kron by a 0xFF block upscales and sets lit texels to 255 in one pass;
+    # a single broadcast store then fills all four channels
+    mask = np.kron(mask, np.full((scale, scale), 0xFF, dtype=np.uint8))
     img = np.zeros((h, w, 4), dtype=np.uint8)
-    x = 4
-    for ch in msg:
-        glyph = _FONT.get(ch, _FONT[' '])
-        for gx, col in enumerate(glyph):
-            for gy in range(7):
-                if (col >> gy) & 1:
-                    xs, xe = x + gx*scale, x + (gx+1)*scale
-                    ys, ye = 4 + gy*scale, 4 + (gy+1)*scale
-                    img[ys:ye, xs:xe, :3] = 255
-                    img[ys:ye, xs:xe,  3] = 255
-        x += 6*scale
+    img[4:4 + 7*scale, 4:4 + cols*scale] = mask[..., None]
     t = _create_tex()
     GL.glBindTexture(GL.GL_TEXTURE_2D, t)
     GL.glTexImage2D(GL.GL_TEXTURE_2D, 0, GL.GL_RGBA, w, h, 0, GL.GL_RGBA, GL.GL_UNSIGNED_BYTE, img)
     GL.glBindTexture(GL.GL_TEXTURE_2D, 0)
     return t, w, h
 
+# ----------------------------------------------------------
+# GLFW key -> X11 keysym (arrows/enter/esc/backspace/tab + printable ASCII)
+# ----------------------------------------------------------
+# flat table indexed by GLFW key code (KEY_LAST is 348); 0 = no mapping
+_KS_TBL = [0] * 512
+for _k in range(32, 127):
+    _KS_TBL[_k] = _k
+for _k, _v in {
+    glfw.KEY_LEFT:  0xFF51,
+    glfw.KEY_UP:    0xFF52,
+    glfw.KEY_RIGHT: 0xFF53,
+    glfw.KEY_DOWN:  0xFF54,
+    glfw.KEY_ENTER: 0xFF0D,
+    glfw.KEY_ESCAPE:0xFF1B,
+    glfw.KEY_BACKSPACE:0xFF08,
+    glfw.KEY_TAB:   0xFF09,
+}.items():
+    _KS_TBL[_k] = _v
+del _k, _v
+
 # ----------------------------------------------------------
 # Main viewer
 # ----------------------------------------------------------
 def run_viewer(lg, win_w=1920, win_h=1080, title="LGMP v6 Client",
                input_sink=None, health_fn=None, ui=None):
 
-    # minimal GLFW->X11 keysym mapper for arrows/enter/esc/backspace/tab
-    import glfw as _glfw
-    _KS = {
-        _glfw.KEY_LEFT:  0xFF51,
-        _glfw.KEY_UP:    0xFF52,
-        _glfw.KEY_RIGHT: 0xFF53,
-        _glfw.KEY_DOWN:  0xFF54,
-        _glfw.KEY_ENTER: 0xFF0D,
-        _glfw.KEY_ESCAPE:0xFF1B,
-        _glfw.KEY_BACKSPACE:0xFF08,
-        _glfw.KEY_TAB:   0xFF09,
-    }
-    def _keysym_from_glfw(key, mods):
-        if key in _KS: return _KS[key]
-        if 32 <= key <= 126: return key
-        return None
-
     if not glfw.init(): raise SystemExit(1)
+    vao_txt = vbo_txt = ebo_txt = None
+    fbo_overlay = tex_overlay = None
+    reader = None
     try:
         glfw.window_hint(glfw.RESIZABLE, True)
         win = glfw.create_window(win_w, win_h, title, None, None)
@@ -194,17 +331,34 @@ def run_viewer(lg, win_w=1920, win_h=1080, title="LGMP v6 Client",
         # build programs/geometry/textures
         prog_tex   = _build_program(VERT_SRC_TEX,   FRAG_SRC_TEX)
         prog_solid = _build_program(VERT_SRC_SOLID, FRAG_SRC_SOLID)
+        prog_txt   = _build_program(VERT_SRC_TXT,   FRAG_SRC_TEX)
+        prog_ovl   = _build_program(VERT_SRC_TEX,   FRAG_SRC_TEX)  # uSwizzle left at rgba
 
         vao_tex, vbo_tex, ebo_tex = _make_quad(prog_tex,   flip_y=True)
         vao_blk, vbo_blk, ebo_blk = _make_quad(prog_solid, flip_y=True)  # aUV safely ignored
 
-        tex_frame = _create_tex()
-        loc_uTex  = GL.glGetUniformLocation(prog_tex, "uTex")
-        loc_uCol  = GL.glGetUniformLocation(prog_solid, "uColor")
+        frame_size = (lg.fb_w, lg.fb_h)
+        tex_frame, pbos = _create_frame_target(*frame_size)
+        frame = 0
+        last_seq = None
+        # frames are copied out of shm on a producer thread; we only upload the newest one
+        reader = FrameReader(lg)
+        reader.start()
+        loc_uTex  = _uniform_loc(prog_tex, "uTex")
+        GL.glUseProgram(prog_tex)
+        GL.glUniform1i(_uniform_loc(prog_tex, "uSwizzle"), SWIZZLE_BGR1)
+        GL.glUseProgram(0)
+        loc_uCol  = _uniform_loc(prog_solid, "uColor")
+        loc_txTex = _uniform_loc(prog_txt, "uTex")
+        loc_uXYWH = _uniform_loc(prog_txt, "uXYWH")
+        loc_ovTex = _uniform_loc(prog_ovl, "uTex")
 
         # pre-bake overlay text texture
         overlay_text = "-- waiting for signal --"
         tex_wait, tw, th = _text_to_tex(overlay_text, scale=3)
+        # static unit quad; placement is a uniform set only when the overlay is re-rendered
+        vao_txt, vbo_txt, ebo_txt = _make_quad(prog_txt, flip_y=False)
+        ovl_size = None
 
         # Input plumbing (UI gets first dibs)
         if input_sink is not None:
@@ -214,11 +368,23 @@ def run_viewer(lg, win_w=1920, win_h=1080, title="LGMP v6 Client",
             except Exception as e:
                 print(f'[viewer] input sink setup failed: {e}', flush=True)
 
+        # redraw only on new frame / health flip / input / resize / expose;
+        # sizes and cursor are cached from callbacks instead of queried per event
+        fbw, fbh = glfw.get_framebuffer_size(win)
+        ww, wh   = glfw.get_window_size(win)
+        cx, cy   = glfw.get_cursor_pos(win)
+        state = {"dirty": True, "fbw": fbw, "fbh": fbh, "ww": ww, "wh": wh, "cx": cx, "cy": cy}
+        sink_resized = getattr(input_sink, "on_window_resized", None)
+        if sink_resized is not None:
+            try: sink_resized(ww, wh)
+            except Exception: pass
+
         def _cb_cursor(w, x, y):
+            state.update(dirty=True, cx=x, cy=y)
             consumed = False
             if ui is not None:
                 try:
-                    consumed = ui.on_mouse(x, y, *glfw.get_window_size(w), pressed=False)
+                    consumed = ui.on_mouse(x, y, state["ww"], state["wh"], pressed=False)
                 except Exception:
                     consumed = False
             if not consumed and input_sink is not None:
@@ -226,10 +392,11 @@ def run_viewer(lg, win_w=1920, win_h=1080, title="LGMP v6 Client",
                 except Exception: pass
 
         def _cb_button(w, button, action, mods):
+            state["dirty"] = True
             consumed = False
             if ui is not None and action in (glfw.PRESS, glfw.REPEAT):
                 try:
-                    consumed = ui.on_mouse(*glfw.get_cursor_pos(w), *glfw.get_window_size(w), pressed=True)
+                    consumed = ui.on_mouse(state["cx"], state["cy"], state["ww"], state["wh"], pressed=True)
                 except Exception:
                     consumed = False
             if not consumed and input_sink is not None:
@@ -238,35 +405,73 @@ def run_viewer(lg, win_w=1920, win_h=1080, title="LGMP v6 Client",
 
         def _cb_scroll(w, dx, dy):
             # let UI ignore scroll for now; pass to sink
+            state["dirty"] = True
             if input_sink is not None:
                 try: input_sink.on_scroll(dx, dy, w)
                 except Exception: pass
 
+        sink_on_key = input_sink.on_key if input_sink is not None else None
+
         def _cb_key(w, key, sc, action, mods):
-            ks = _keysym_from_glfw(key, mods)
-            if ks is not None and input_sink is not None:
-                try: input_sink.on_key(ks, sc, action, mods, w)
+            state["dirty"] = True
+            ks = _KS_TBL[key] if 0 <= key < 512 else 0
+            if ks and sink_on_key is not None:
+                try: sink_on_key(ks, sc, action, mods, w)
                 except Exception: pass
 
         glfw.set_cursor_pos_callback(win, _cb_cursor)
         glfw.set_mouse_button_callback(win, _cb_button)
         glfw.set_scroll_callback(win, _cb_scroll)
         glfw.set_key_callback(win, _cb_key)
+        def _cb_window_size(w, W, H):
+            state.update(dirty=True, ww=W, wh=H)
+            if sink_resized is not None:
+                try: sink_resized(W, H)
+                except Exception: pass
+
+        glfw.set_framebuffer_size_callback(win, lambda w, W, H: state.update(dirty=True, fbw=W, fbh=H))
+        glfw.set_window_size_callback(win, _cb_window_size)
+        glfw.set_window_refresh_callback(win, lambda w: state.update(dirty=True))
 
         # main loop
+        last_unhealthy = None
         while not glfw.window_should_close(win):
             glfw.poll_events()
 
-            # Update LG frame texture if new data available
+            # Update LG frame texture only when the reader published a new frame
             try:
-                slot = lg.current_slot()
-                data = lg.read_frame_tight(slot)
-                if data:
-                    _upload_bgr(tex_frame, lg.fb_w, lg.fb_h, data, lg.bpp)
+                seq, data = reader.latest
+                if seq != last_seq:
+                    if data and (lg.fb_w, lg.fb_h) != frame_size:
+                        # storage is immutable: recreate only when the guest mode changes
+                        _delete_frame_target(tex_frame, pbos)
+                        frame_size = (lg.fb_w, lg.fb_h)
+                        tex_frame, pbos = _create_frame_target(*frame_size)
+                    if data:
+                        _upload_bgr_sub(tex_frame, lg.fb_w, lg.fb_h, data, lg.bpp, pbos[frame % len(pbos)])
+                        frame += 1
+                        last_seq = seq
+                        state["dirty"] = True
             except Exception:
                 pass
 
-            fbw, fbh = glfw.get_framebuffer_size(win)
+            unhealthy = False
+            if health_fn is not None:
+                try:
+                    unhealthy = (health_fn() != "ok")
+                except Exception:
+                    unhealthy = False
+            if unhealthy != last_unhealthy:
+                last_unhealthy = unhealthy
+                state["dirty"] = True
+
+            if not state["dirty"]:
+                # idle: sleep in the event queue instead of spinning at vsync
+                glfw.wait_events_timeout(1 / 60.0)
+                continue
+            state["dirty"] = False
+
+            fbw, fbh = state["fbw"], state["fbh"]
             GL.glViewport(0, 0, fbw, fbh)
             GL.glClearColor(0, 0, 0, 1)
             GL.glClear(GL.GL_COLOR_BUFFER_BIT)
@@ -280,68 +485,61 @@ def run_viewer(lg, win_w=1920, win_h=1080, title="LGMP v6 Client",
             GL.glDrawElements(GL.GL_TRIANGLES, 6, GL.GL_UNSIGNED_INT, None)
             GL.glBindVertexArray(0)
 
-            # Health overlay (draw BEFORE UI so UI stays visible)
-            unhealthy = False
-            if health_fn is not None:
-                try:
-                    unhealthy = (health_fn() != "ok")
-                except Exception:
-                    unhealthy = False
+            # Health overlay (draw BEFORE UI so UI stays visible).
+            # Rasterized once per framebuffer size into an offscreen texture, then composited.
             if unhealthy:
-                # semi-transparent black
+                if ovl_size != (fbw, fbh):
+                    if fbo_overlay is not None:
+                        _delete_overlay_target(fbo_overlay, tex_overlay)
+                    fbo_overlay, tex_overlay = _create_overlay_target(fbw, fbh)
+                    ovl_size = (fbw, fbh)
+
+                    GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, fbo_overlay)
+                    GL.glClearColor(0, 0, 0, 0)
+                    GL.glClear(GL.GL_COLOR_BUFFER_BIT)
+                    # straight-alpha sources "over" a premultiplied destination
+                    GL.glEnable(GL.GL_BLEND)
+                    GL.glBlendFuncSeparate(GL.GL_SRC_ALPHA, GL.GL_ONE_MINUS_SRC_ALPHA,
+                                           GL.GL_ONE, GL.GL_ONE_MINUS_SRC_ALPHA)
+
+                    # semi-transparent black
+                    GL.glUseProgram(prog_solid)
+                    GL.glUniform4f(loc_uCol, 0.0, 0.0, 0.0, 0.6)
+                    GL.glBindVertexArray(vao_blk)
+                    GL.glDrawElements(GL.GL_TRIANGLES, 6, GL.GL_UNSIGNED_INT, None)
+
+                    # centered text, keep original text size (tw,th)
+                    w_px = min(tw, fbw - 40)
+                    h_px = th
+                    x0 = (fbw - w_px) // 2
+                    y0 = (fbh - h_px) // 2
+                    # convert to NDC
+                    X0 = (x0 / fbw) * 2.0 - 1.0
+                    X1 = ((x0 + w_px) / fbw) * 2.0 - 1.0
+                    Y0 = 1.0 - 2.0 * ((y0 + h_px) / fbh)
+                    Y1 = 1.0 - 2.0 * (y0 / fbh)
+                    GL.glUseProgram(prog_txt)
+                    GL.glActiveTexture(GL.GL_TEXTURE0)
+                    GL.glBindTexture(GL.GL_TEXTURE_2D, tex_wait)
+                    GL.glUniform1i(loc_txTex, 0)
+                    GL.glUniform4f(loc_uXYWH, (X0 + X1) * 0.5, (Y0 + Y1) * 0.5,
+                                   (X1 - X0) * 0.5, (Y1 - Y0) * 0.5)
+                    GL.glBindVertexArray(vao_txt)
+                    GL.glDrawElements(GL.GL_TRIANGLES, 6, GL.GL_UNSIGNED_INT, None)
+                    GL.glBindVertexArray(0)
+                    GL.glBindFramebuffer(GL.GL_FRAMEBUFFER, 0)
+
+                # composite the cached (premultiplied) overlay
                 GL.glEnable(GL.GL_BLEND)
-                GL.glBlendFunc(GL.GL_SRC_ALPHA, GL.GL_ONE_MINUS_SRC_ALPHA)
-                GL.glUseProgram(prog_solid)
-                GL.glUniform4f(loc_uCol, 0.0, 0.0, 0.0, 0.6)
-                GL.glBindVertexArray(vao_blk)
-                GL.glDrawElements(GL.GL_TRIANGLES, 6, GL.GL_UNSIGNED_INT, None)
-                GL.glBindVertexArray(0)
-
-                # centered text
-                GL.glUseProgram(prog_tex)
+                GL.glBlendFunc(GL.GL_ONE, GL.GL_ONE_MINUS_SRC_ALPHA)
+                GL.glUseProgram(prog_ovl)
                 GL.glActiveTexture(GL.GL_TEXTURE0)
-                GL.glBindTexture(GL.GL_TEXTURE_2D, tex_wait)
-                GL.glUniform1i(loc_uTex, 0)
-
-                # compute centered rect in NDC with some scaling
-                # draw at ~1/3 width of the screen
-                scale_px = max(1, fbw // 3)
-                # keep original text size (tw,th) and center it
-                w_px = min(tw, fbw - 40)
-                h_px = th
-                x0 = (fbw - w_px) // 2
-                y0 = (fbh - h_px) // 2
-                # convert to NDC
-                X0 = (x0 / fbw) * 2.0 - 1.0
-                X1 = ((x0 + w_px) / fbw) * 2.0 - 1.0
-                Y0 = 1.0 - 2.0 * ((y0 + h_px) / fbh)
-                Y1 = 1.0 - 2.0 * (y0 / fbh)
-
-                # build a small temp quad for the text
-                verts = np.array([
-                    [X0, Y0, 0.0, 0.0],
-                    [X1, Y0, 1.0, 0.0],
-                    [X1, Y1, 1.0, 1.0],
-                    [X0, Y1, 0.0, 1.0],
-                ], dtype=np.float32)
-                idx = np.array([0,1,2, 0,2,3], dtype=np.uint32)
-                vao = GL.glGenVertexArrays(1)
-                vbo = GL.glGenBuffers(1)
-                ebo = GL.glGenBuffers(1)
-                GL.glBindVertexArray(vao)
-                GL.glBindBuffer(GL.GL_ARRAY_BUFFER, vbo)
-                GL.glBufferData(GL.GL_ARRAY_BUFFER, verts.nbytes, verts, GL.GL_STREAM_DRAW)
-                GL.glBindBuffer(GL.GL_ELEMENT_ARRAY_BUFFER, ebo)
-                GL.glBufferData(GL.GL_ELEMENT_ARRAY_BUFFER, idx.nbytes, idx, GL.GL_STREAM_DRAW)
-                loc_pos = GL.glGetAttribLocation(prog_tex, "aPos")
-                loc_uv  = GL.glGetAttribLocation(prog_tex, "aUV")
-                GL.glEnableVertexAttribArray(loc_pos)
-                GL.glVertexAttribPointer(loc_pos, 2, GL.GL_FLOAT, GL.GL_FALSE, 16, ctypes.c_void_p(0))
-                GL.glEnableVertexAttribArray(loc_uv)
-                GL.glVertexAttribPointer(loc_uv,  2, GL.GL_FLOAT, GL.GL_FALSE, 16, ctypes.c_void_p(8))
+                GL.glBindTexture(GL.GL_TEXTURE_2D, tex_overlay)
+                GL.glUniform1i(loc_ovTex, 0)
+                GL.glBindVertexArray(vao_txt)  # unit quad, v=0 at the bottom like the FBO
                 GL.glDrawElements(GL.GL_TRIANGLES, 6, GL.GL_UNSIGNED_INT, None)
                 GL.glBindVertexArray(0)
-                GL.glDeleteBuffers(1, [vbo]); GL.glDeleteBuffers(1, [ebo]); GL.glDeleteVertexArrays(1, [vao])
+                GL.glDisable(GL.GL_BLEND)
 
             # Draw UI last so it stays on top of everything
             if ui is not None:
@@ -353,4 +551,14 @@ def run_viewer(lg, win_w=1920, win_h=1080, title="LGMP v6 Client",
             glfw.swap_buffers(win)
 
     finally:
+        if reader is not None:
+            reader.stop(); reader.join(0.5)
+        if vao_txt is not None:
+            try:
+                GL.glDeleteBuffers(2, [vbo_txt, ebo_txt]); GL.glDeleteVertexArrays(1, [vao_txt])
+            except Exception:
+                pass
+        if fbo_overlay is not None:
+            try: _delete_overlay_target(fbo_overlay, tex_overlay)
+            except Exception: pass
         glfw.terminate()
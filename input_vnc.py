@@ -6,6 +6,10 @@ try:
 except Exception:
     glfw = None
 
+# RFB client messages: PointerEvent (type 5) and KeyEvent (type 4)
+_PTR = struct.Struct("!BBHH")
+_KEY = struct.Struct("!BBHI")
+
 class VNCInputProxy(threading.Thread):
     def __init__(self, host="127.0.0.1", port=5901, verbose=False,
                  offset_x=0, offset_y=0, scale_x=1.0, scale_y=1.0, **_compat):
@@ -15,15 +19,24 @@ class VNCInputProxy(threading.Thread):
         self.scale_x, self.scale_y  = float(scale_x), float(scale_y)
 
         self._stop = threading.Event()
-        self._q    = queue.Queue()
+        self._q    = queue.Queue(maxsize=1024)
         self._sock = None
         self._win  = None
+        self._win_size = None   # (w, h) pushed by the viewer; avoids a GLFW query per event
+        # reusable wire buffers; only the worker thread packs into them
+        self._ptr_buf = bytearray(_PTR.size)
+        self._key_buf = bytearray(_KEY.size)
+        self._out     = bytearray()
         self.remote_w = None
         self.remote_h = None
 
         self._last_x = 0.0
         self._last_y = 0.0
 
+        # Latest mapped pointer position; moves only mark it dirty and the worker sends the newest one
+        self._ptr_xy = (0, 0)
+        self._ptr_pending = False
+
         # Track button state (RFB mask bits): 1=left, 2=middle, 4=right, 8/16=wheel up/down (edge only)
         self._btn_mask = 0
 
@@ -37,11 +50,16 @@ class VNCInputProxy(threading.Thread):
             except Exception:
                 pass
 
+    def on_window_resized(self, ww, wh):
+        self._win_size = (int(ww), int(wh))
+
     def on_cursor_pos(self, x, y, w):
         self._last_x, self._last_y = float(x), float(y)
-        xr, yr = self._current_window_xy()
-        # Send move with current button mask so drag is preserved
-        self._send_pointer(xr, yr, self._btn_mask)
+        self._ptr_xy = self._current_window_xy()
+        # Coalesce: only one pending move in the queue, worker reads the newest position
+        if not self._ptr_pending:
+            self._ptr_pending = True
+            self._enqueue("ptr_dirty", None)
 
     def on_mouse_button(self, button, action, mods, w):
         # GLFW: 0=left, 1=right, 2=middle
@@ -56,27 +74,27 @@ class VNCInputProxy(threading.Thread):
             self._btn_mask &= ~bit
 
         xr, yr = self._current_window_xy()
-        self._send_pointer(xr, yr, self._btn_mask)
+        self._enqueue("ptr", (xr, yr, self._btn_mask))
 
     def on_scroll(self, dx, dy, w):
         xr, yr = self._current_window_xy()
         # Emit wheel as short presses (do not latch into _btn_mask)
         if dy > 0:
-            self._send_pointer(xr, yr, self._btn_mask | 8)   # wheel up
-            self._send_pointer(xr, yr, self._btn_mask)
+            self._enqueue("ptr", (xr, yr, self._btn_mask | 8))   # wheel up
+            self._enqueue("ptr", (xr, yr, self._btn_mask))
         elif dy < 0:
-            self._send_pointer(xr, yr, self._btn_mask | 16)  # wheel down
-            self._send_pointer(xr, yr, self._btn_mask)
+            self._enqueue("ptr", (xr, yr, self._btn_mask | 16))  # wheel down
+            self._enqueue("ptr", (xr, yr, self._btn_mask))
         if dx > 0:
-            self._send_pointer(xr, yr, self._btn_mask | 32)  # wheel right
-            self._send_pointer(xr, yr, self._btn_mask)
+            self._enqueue("ptr", (xr, yr, self._btn_mask | 32))  # wheel right
+            self._enqueue("ptr", (xr, yr, self._btn_mask))
         elif dx < 0:
-            self._send_pointer(xr, yr, self._btn_mask | 64)  # wheel left
-            self._send_pointer(xr, yr, self._btn_mask)
+            self._enqueue("ptr", (xr, yr, self._btn_mask | 64))  # wheel left
+            self._enqueue("ptr", (xr, yr, self._btn_mask))
 
     def on_key(self, keysym, sc, action, mods, w):
         down = 1 if action != 0 else 0
-        self._send_key(int(keysym), down)
+        self._enqueue("key", (int(keysym), down))
 
     # ---------- thread loop ----------
     def stop(self):
@@ -92,17 +110,43 @@ class VNCInputProxy(threading.Thread):
             self._sock = self._connect_and_handshake()
             if not self._sock:
                 return
+            sent_xy = None  # last pointer position encoded
             while not self._stop.is_set():
                 try:
-                    kind, args = self._q.get(timeout=0.1)
+                    items = [self._q.get(timeout=0.1)]
                 except queue.Empty:
                     continue
-                if kind == "key":
-                    ks, down = args
-                    self._send_key(ks, down)
-                elif kind == "ptr":
-                    x, y, mask = args
-                    self._send_pointer(int(x), int(y), int(mask))
+                while True:
+                    try:
+                        items.append(self._q.get_nowait())
+                    except queue.Empty:
+                        break
+                self._ptr_pending = False
+                # Button/wheel/key edges go out in order; plain moves collapse into one trailing update.
+                # The whole batch is encoded into one buffer and written with a single sendall.
+                # "ptr_dirty" only wakes the worker: the trailing move is decided by comparing the
+                # latest _ptr_xy with the last position encoded, since a move can land after a "ptr" item.
+                out = self._out
+                out.clear()
+                for kind, args in items:
+                    if kind == "key":
+                        # flush a pending move first so the key lands at the new position
+                        xy = self._ptr_xy
+                        if xy != sent_xy:
+                            self._encode_pointer(out, xy[0], xy[1], self._btn_mask)
+                            sent_xy = xy
+                        ks, down = args
+                        self._encode_key(out, ks, down)
+                    elif kind == "ptr":
+                        x, y, mask = args
+                        self._encode_pointer(out, x, y, mask)
+                        sent_xy = (x, y)
+                xy = self._ptr_xy
+                if xy != sent_xy:
+                    self._encode_pointer(out, xy[0], xy[1], self._btn_mask)
+                    sent_xy = xy
+                if out:
+                    self._sock.sendall(out)
         except Exception as e:
             if self.verbose:
                 print(f"[vnc] exit: {e}", flush=True)
@@ -114,32 +158,39 @@ class VNCInputProxy(threading.Thread):
                 pass
 
     # ---------- internals ----------
+    def _enqueue(self, kind, args):
+        try:
+            self._q.put_nowait((kind, args))
+        except queue.Full:
+            pass  # worker not draining (not connected); drop rather than block the UI thread
+
     def _log(self, msg):
         if self.verbose:
             print(f"[vnc] {msg}", flush=True)
 
     def _connect_and_handshake(self):
         s = socket.create_connection((self.host, self.port), timeout=5.0)
+        s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
 
         # ProtocolVersion
-        srv_ver = s.recv(12)
-        if not srv_ver or not srv_ver.startswith(b"RFB "):
+        srv_ver = self._recvn(s, 12)
+        if not srv_ver.startswith(b"RFB "):
             raise RuntimeError("invalid server greeting")
         s.sendall(b"RFB 003.008\n")
 
         # Security types
-        sec_count = s.recv(1)
-        if not sec_count:
-            raise RuntimeError("no security types")
+        sec_count = self._recvn(s, 1)
         n = sec_count[0]
-        sec_types = s.recv(n)
+        if not n:
+            raise RuntimeError("no security types")
+        sec_types = self._recvn(s, n)
         if 1 not in sec_types:
             raise RuntimeError(f"server doesn't offer None security: {sec_types}")
         s.sendall(b"\x01")  # None
 
         # SecurityResult
-        res = s.recv(4)
-        if len(res) != 4 or struct.unpack("!I", res)[0] != 0:
+        res = self._recvn(s, 4)
+        if struct.unpack("!I", res)[0] != 0:
             raise RuntimeError("security failed")
 
         # ClientInit (share desktop)
@@ -161,20 +212,22 @@ class VNCInputProxy(threading.Thread):
         return s
 
     def _recvn(self, s, n):
-        data = b""
-        while len(data) < n:
-            chunk = s.recv(n - len(data))
-            if not chunk:
+        buf = bytearray(n)
+        mv  = memoryview(buf)
+        off = 0
+        while off < n:
+            k = s.recv_into(mv[off:], n - off)
+            if not k:
                 raise ConnectionError("unexpected EOF")
-            data += chunk
-        return data
+            off += k
+        return bytes(buf)
 
     def _current_window_xy(self):
         # GLFW window coords are top-left origin — same as RFB
-        if self._win is None or not glfw:
+        if self._win_size is None and (self._win is None or not glfw):
             xr, yr = int(self._last_x), int(self._last_y)
         else:
-            ww, wh = glfw.get_window_size(self._win)
+            ww, wh = self._win_size or glfw.get_window_size(self._win)
             rw = max(1, self.remote_w or ww)
             rh = max(1, self.remote_h or wh)
             xr = int(float(self._last_x) * rw / max(1, ww))
@@ -184,22 +237,25 @@ class VNCInputProxy(threading.Thread):
         xr = int(xr * self.scale_x + self.offset_x)
         yr = int(yr * self.scale_y + self.offset_y)
 
-        # clamp
-        if self.remote_w: xr = max(0, min(self.remote_w - 1, xr))
-        if self.remote_h: yr = max(0, min(self.remote_h - 1, yr))
+        # clamp (to the RFB u16 range when the remote size is unknown) so encoders need no masking
+        xr = max(0, min((self.remote_w or 0x10000) - 1, xr))
+        yr = max(0, min((self.remote_h or 0x10000) - 1, yr))
 
-        self._log(f"ptr x={xr} y={yr} mask=0x{self._btn_mask:02X}")
+        if self.verbose:
+            self._log(f"ptr x={xr} y={yr} mask=0x{self._btn_mask:02X}")
         return xr, yr
 
     # ------- RFB encoders -------
-    def _send_key(self, keysym, down):
-        if not self._sock: return
-        msg = struct.pack("!BBH I", 4, 1 if down else 0, 0, int(keysym))
-        self._sock.sendall(msg)
-        self._log(f"key 0x{int(keysym):04X} {'down' if down else 'up'}")
-
-    def _send_pointer(self, x, y, mask):
-        if not self._sock: return
-        msg = struct.pack("!BBHH", 5, int(mask) & 0xFF, int(x) & 0xFFFF, int(y) & 0xFFFF)
-        self._sock.sendall(msg)
-        self._log(f"ptr x={x} y={y} mask=0x{int(mask)&0xFF:02X}")
+    # append to the worker's batch buffer; run() flushes it with one sendall
+    def _encode_key(self, out, keysym, down):
+        _KEY.pack_into(self._key_buf, 0, 4, 1 if down else 0, 0, keysym & 0xFFFFFFFF)
+        out += self._key_buf
+        if self.verbose:
+            self._log(f"key 0x{keysym:04X} {'down' if down else 'up'}")
+
+    def _encode_pointer(self, out, x, y, mask):
+        # x/y come pre-clamped from _current_window_xy, mask is at most 7 button bits
+        _PTR.pack_into(self._ptr_buf, 0, 5, mask, x, y)
+        out += self._ptr_buf
+        if self.verbose:
+            self._log(f"ptr x={x} y={y} mask=0x{mask:02X}")
@@ -2,18 +2,13 @@
 import sys, os, mmap, struct, time, threading, termios, tty
 from datetime import datetime
 from collections import deque
+import numpy as np
 
-def u32(mm, off):
-    return struct.unpack_from("<I", mm, off)[0]
+_U32 = struct.Struct("<I")
+_U32_UNPACK_FROM = _U32.unpack_from
 
-class Ring3:
-    def __init__(self):
-        self.buf=[]
-    def push(self, item):
-        self.buf.append(item)
-        if len(self.buf)>3:
-            self.buf.pop(0)
-    def last3(self): return list(self.buf)
+def u32(mm, off):
+    return _U32_UNPACK_FROM(mm, off)[0]
 
 class RateMeter:
     def __init__(self, horizon=1.0):
@@ -31,42 +26,61 @@ class RateMeter:
         dt = max(1e-6, t1 - t0)
         return max(0.0, (v1 - v0) / dt)
 
+class RingN:
+    """Last n (t, v) changes as parallel numpy arrays; empty slots carry t=-inf."""
+    def __init__(self, n=3):
+        self.t = np.full(n, -np.inf, dtype=np.float64)
+        self.v = np.zeros(n, dtype=np.uint32)
+        self.i = 0          # next write slot
+        self.count = 0
+    def push(self, t, v):
+        i = self.i
+        self.v[i] = v; self.t[i] = t   # value first: a racing reader sees an old stamp, not a new stamp on an old value
+        self.i = (i + 1) % len(self.t)
+        self.count = min(self.count + 1, len(self.t))
+    def __len__(self): return self.count
+    def __iter__(self):
+        # oldest -> newest, as Python scalars
+        n = len(self.t); start = (self.i - self.count) % n
+        order = [(start + k) % n for k in range(self.count)]
+        return iter(zip(self.t[order].tolist(), self.v[order].tolist()))
+
 # --- Predicates ---
 class PredBase:
     def describe(self): return ""
     def check(self, cur, history): return True
+    def valid_until(self, history): return float("inf")  # when check() can flip without a new value
 
 class PredEq(PredBase):
     def __init__(self, val): self.val = int(val)
     def describe(self): return f"==0x{self.val:08X}"
     def check(self, cur, history):
-        if cur is None: cur = 0
-        return int(cur) == self.val
+        return (0 if cur is None else cur) == self.val
 
 class PredNZ(PredBase):
     def describe(self): return "!=0"
     def check(self, cur, history):
-        if cur is None: cur = 0
-        return int(cur) != 0
+        return cur is not None and cur != 0
 
 class PredOneOf(PredBase):
-    def __init__(self, vals): self.vals = set(int(x) for x in vals)
+    def __init__(self, vals): self.vals = frozenset(int(x) for x in vals)
     def describe(self): return "oneof{" + ",".join(f"0x{v:08X}" for v in sorted(self.vals)) + "}"
     def check(self, cur, history):
-        if cur is None: cur = 0
-        return int(cur) in self.vals
+        return (0 if cur is None else cur) in self.vals
 
 class PredRecentEq(PredBase):
     def __init__(self, val, window_ms=1000):
         self.val = int(val); self.win = float(window_ms)/1000.0
     def describe(self): return f"recent==0x{self.val:08X} in {int(self.win*1000)}ms"
     def check(self, cur, history):
-        now = time.time()
-        it = history if history is not None else []
-        for t,v in reversed(it):
-            if now - t > self.win: break
-            if int(v) == self.val: return True
-        return False
+        if not history: return False
+        cutoff = time.monotonic() - self.win
+        return bool((history.v[history.t >= cutoff] == self.val).any())
+    def valid_until(self, history):
+        # a pass lapses once the newest matching change ages out of the window
+        if not history: return float("inf")
+        t = history.t[(history.v == self.val) & np.isfinite(history.t)]
+        return float(t.max()) + self.win if t.size else float("inf")
 
 # --- Monitor ---
 class SignalMonitor4:
@@ -83,9 +97,13 @@ class SignalMonitor4:
         self.verbose  = verbose
         self.fps_ok   = float(fps_ok)
         self.fps_dead = float(fps_dead)
-        self.stop_ev  = threading.Event()
+        self.stop_ev  = threading.Event()   # public stop; poll_loop polls it every 16 ticks, _stop every tick
+        self._stop    = False
         self.fd       = None
         self.mm       = None
+        self._snap_f  = None   # snapshot log, held open between snapshots (set in open)
+        self._u32view = None   # uint32 view over the whole segment (set in open)
+        self._watch_idx = None # dword index per watch address, for one gather per tick
 
         watch_addrs = [idx_off, flag_off] + sorted(self.preds.keys())
         seen = set()
@@ -94,43 +112,78 @@ class SignalMonitor4:
             if a not in seen:
                 self.watch_addrs.append(a); seen.add(a)
 
-        self.hist     = {a: Ring3() for a in self.watch_addrs}
-        self.last_val = {a: 0        for a in self.watch_addrs}
+        self._classify_addrs = frozenset([flag_off, *self.preds])
+        self.hist     = {a: RingN(3) for a in self.watch_addrs}  # last 3 (t, v) changes
+        # current value per watch address, by position; replaced wholesale each poll tick
+        self._addr_pos = {a: i for i, a in enumerate(self.watch_addrs)}
+        self._vals     = np.zeros(len(self.watch_addrs), dtype=np.uint32)
+        self._flag_pos = self._addr_pos[flag_off]
+        self._pred_pos = [(self._addr_pos[a], a, p) for a, p in self.preds.items()]
         self.fps      = RateMeter(horizon=fps_horizon)
         self.last_print = 0.0
+        self._wall_off = time.time() - time.monotonic()  # history stamps are monotonic; shift for display
+        self._gen = 0                  # bumped by poll_loop when flag/pred values change
+        self._classify_cache = (None, float("-inf"), None)  # (key, valid_until, result)
 
     def open(self):
         self.fd = os.open(self.shm_path, os.O_RDONLY)
         st = os.fstat(self.fd)
         self.mm = mmap.mmap(self.fd, st.st_size, mmap.MAP_SHARED, mmap.PROT_READ)
+        if self.out_file != os.devnull:
+            self._snap_f = open(self.out_file, "a", encoding="utf-8", buffering=1<<16)
         if self.verbose:
             print(f"[mon4] opened {self.shm_path} ({st.st_size} bytes); watching {len(self.watch_addrs)} addresses")
-        for a in self.watch_addrs:
+        vals = np.zeros(len(self.watch_addrs), dtype=np.uint32)
+        for i, a in enumerate(self.watch_addrs):
             try:
                 v = u32(self.mm,a)
-                self.last_val[a] = v
+                vals[i] = v
                 if self.verbose:
                     print(f"[mon4]   0x{a:08X} = 0x{v:08X}")
             except Exception as e:
-                self.last_val[a] = 0
                 if self.verbose:
                     print(f"[mon4]   0x{a:08X} = <err {e}>")
+        # vector path needs every address dword-aligned and in range; otherwise fall back to per-address reads
+        if all(a % 4 == 0 and 0 <= a and a + 4 <= st.st_size for a in self.watch_addrs):
+            self._u32view = np.frombuffer(self.mm, dtype=np.uint32, count=st.st_size // 4)
+            self._watch_idx = np.array([a >> 2 for a in self.watch_addrs], dtype=np.intp)
+        self._vals = vals
+
+    def stop(self):
+        self._stop = True
+        self.stop_ev.set()
 
     def close(self):
+        self.stop()
+        self._u32view = None  # drop the buffer export so the mmap can close
         try:
+            if self._snap_f: self._snap_f.close()
+            self._snap_f = None
             if self.mm: self.mm.close()
         finally:
             if self.fd: os.close(self.fd)
 
     def _classify(self, now):
-        fps = self.fps.rate()
-        flagv = self.last_val.get(self.flag_off, 0) or 0
+        fps = round(self.fps.rate(), 1)  # classify on the bucketed value so the key fully determines the result
+        key = (self._gen, fps)
+        ckey, cuntil, cres = self._classify_cache
+        if key == ckey and now < cuntil:
+            return cres
+        res = self._classify_uncached(fps)
+        until = min((p.valid_until(self.hist.get(a, ())) for a, p in self.preds.items()),
+                    default=float("inf"))
+        self._classify_cache = (key, until, res)
+        return res
+
+    def _classify_uncached(self, fps):
+        vals = self._vals.tolist()  # one C call; list indexing beats per-element numpy scalars
+        flagv = vals[self._flag_pos]
         masked = (flagv & self.flag_mask) != 0 if self.flag_mask else True
 
         preds_ok = True
-        for addr, pred in self.preds.items():
-            cur = self.last_val.get(addr, 0) or 0
-            history = self.hist.get(addr).buf if addr in self.hist else []
+        for pos, addr, pred in self._pred_pos:
+            cur = vals[pos]
+            history = self.hist.get(addr, ())
             if not pred.check(cur, history):
                 preds_ok = False
                 break
@@ -145,62 +198,90 @@ class SignalMonitor4:
         if not preds_ok: reasons.append("predicates failed")
         return "problematic", ", ".join(reasons) if reasons else "unknown"
 
+    def _read_watch(self):
+        """Current value of every watch address as a fresh uint32 array (watch_addrs order)."""
+        if self._watch_idx is not None:
+            return self._u32view[self._watch_idx]  # fancy index -> copy
+        cur = self._vals.copy()
+        for i, a in enumerate(self.watch_addrs):
+            try:
+                cur[i] = u32(self.mm, a)
+            except Exception:
+                pass
+        return cur
+
     def poll_loop(self):
         try:
-            while not self.stop_ev.is_set():
-                now = time.time()
-                try:
-                    idxv = u32(self.mm, self.idx_off)
-                except Exception:
-                    idxv = self.last_val.get(self.idx_off, 0) or 0
+            deadline = time.monotonic()
+            tick = 0
+            while not self._stop:
+                # stop_ev is still the public way to stop (read_space_loop sets it); check it every 16 ticks
+                tick += 1
+                if (tick & 15) == 0 and self.stop_ev.is_set():
+                    break
+                now = time.monotonic()
+                cur = self._read_watch()
+                idxv = int(cur[0])  # watch_addrs[0] is idx_off
                 self.fps.push(now, idxv)
-                self.last_val[self.idx_off] = idxv
-
-                for a in self.watch_addrs:
-                    try:
-                        v = u32(self.mm, a)
-                    except Exception:
-                        v = self.last_val.get(a, 0) or 0
-                    if v != self.last_val.get(a, 0):
-                        self.last_val[a] = v
-                        self.hist[a].push((now, v))
-                        if self.verbose and a == self.idx_off:
-                            ts = datetime.fromtimestamp(now).strftime("%H:%M:%S.%f")[:-3]
-                            print(f"[mon4] idx 0x{v:08X} @ {ts} (fps {self.fps.rate():.1f})")
+
+                # one vector compare; only changed addresses touch Python
+                changed = np.flatnonzero(cur != self._vals).tolist()
+                bump = False
+                for i in changed:
+                    a = self.watch_addrs[i]
+                    self.hist[a].push(now, int(cur[i]))
+                    bump = bump or a in self._classify_addrs
+                # publish values (and history) before the generation bump, so a reader that
+                # sees the new _gen can never classify against the old _vals
+                self._vals = cur
+                if bump:
+                    self._gen += 1
+                if self.verbose and 0 in changed:  # watch_addrs[0] is idx_off
+                    ts = datetime.now().strftime("%H:%M:%S.%f")[:-3]
+                    print(f"[mon4] idx 0x{idxv:08X} @ {ts} (fps {self.fps.rate():.1f})")
 
                 if self.verbose and (now - self.last_print) > 1.0:
                     self.last_print = now
                     status, reason = self._classify(now)
-                    flagv = self.last_val.get(self.flag_off, 0) or 0
+                    flagv = int(cur[self._flag_pos])
                     masked = (flagv & self.flag_mask) != 0 if self.flag_mask else True
                     print(f"[mon4] status={status} ({reason}); mask={'1' if masked else '0'}; fps={self.fps.rate():.1f}")
-                time.sleep(self.poll_s)
+                # absolute schedule: work time doesn't stretch the period; resync if we fell behind
+                deadline += self.poll_s
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                elif delay < -self.poll_s:
+                    deadline = time.monotonic()
         except Exception as e:
             if self.verbose:
                 print(f"[mon4] poll exit: {e}")
 
     def snapshot(self, label=None):
         ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        status, reason = self._classify(time.time())
+        status, reason = self._classify(time.monotonic())
         lines = []
         lines.append(f"=== SNAPSHOT {ts} {f'[{label}]' if label else ''} ===")
         lines.append(f"status={status} ({reason}); fps={self.fps.rate():.1f}")
-        flagv = self.last_val.get(self.flag_off, 0) or 0
+        vals = self._vals.tolist()
+        flagv = vals[self._flag_pos]
         lines.append(f"flag 0x{self.flag_off:08X} & 0x{self.flag_mask:08X} => 0x{flagv & self.flag_mask:08X} (raw=0x{flagv:08X})")
-        for a,p in self.preds.items():
-            cur = self.last_val.get(a, 0) or 0
-            ok = p.check(cur, self.hist.get(a).buf if a in self.hist else [])
+        for pos, a, p in self._pred_pos:
+            cur = vals[pos]
+            ok = p.check(cur, self.hist.get(a, ()))
             lines.append(f"pred  0x{a:08X}: cur=0x{cur:08X}, require {p.describe()} -> {'OK' if ok else 'FAIL'}")
-        for a in self.watch_addrs:
-            cur = self.last_val.get(a, 0) or 0
-            hist = self.hist[a].last3()
+        for a, cur in zip(self.watch_addrs, vals):
+            hist = list(self.hist[a])
             lines.append(f"addr 0x{a:08X}: current=0x{cur:08X}")
             for i,(t,v) in enumerate(hist, start=1):
-                tstr = datetime.fromtimestamp(t).strftime("%H:%M:%S.%f")[:-3]
+                tstr = datetime.fromtimestamp(t + self._wall_off).strftime("%H:%M:%S.%f")[:-3]
                 lines.append(f"  -#{i} 0x{v:08X} @ {tstr}")
         lines.append("")
-        with open(self.out_file, "a", encoding="utf-8") as f:
-            f.write("\n".join(lines))
+        if self._snap_f is not None:
+            self._snap_f.write("\n".join(lines)); self._snap_f.flush()
+        elif self.out_file != os.devnull:  # not open()ed
+            with open(self.out_file, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines))
         print(f"[mon4] wrote snapshot to {self.out_file} ({status})")
 
 # Optional spacebar loop (for standalone use)
@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 import os, time, mmap, struct
+import numpy as np
 
 from lgmp_profile import (
     SET_BITS,
@@ -7,17 +8,38 @@ from lgmp_profile import (
     ACK_RANGES_DEFAULT, ACK_FALLBACK_DEFAULT,
 )
 
-def _u32(mm, off): return struct.unpack_from("<I", mm, off)[0]
-def _p32(mm, off, val): struct.pack_into("<I", mm, off, val & 0xFFFFFFFF)
+_U32 = struct.Struct("<I")
+_U32_UNPACK_FROM = _U32.unpack_from
+_U32_PACK_INTO   = _U32.pack_into
+
+def _u32(mm, off): return _U32_UNPACK_FROM(mm, off)[0]
+def _p32(mm, off, val): _U32_PACK_INTO(mm, off, val & 0xFFFFFFFF)
 
 def _ensure_connected(mm, flag_off, flag_mask):
     cur = _u32(mm, flag_off)
     if (cur & flag_mask) == 0:
         _p32(mm, flag_off, cur | flag_mask)
 
+def _apply_set_bits(mm, idx_off, verbose):
+    items = [(off, mask) for off, mask in SET_BITS.items() if off != idx_off]  # never touch the read-index
+    offs  = np.array([o for o, _ in items], dtype=np.int64) >> 2  # SET_BITS offsets are dword-aligned
+    masks = np.array([m for _, m in items], dtype=np.uint32)
+    u32v = np.frombuffer(mm, dtype=np.uint32, count=len(mm) // 4)
+    try:
+        cur  = u32v[offs]
+        newv = cur | masks
+        diff = newv != cur
+        u32v[offs[diff]] = newv[diff]  # write back only the dwords that change
+        if verbose:
+            for off, mask, v in zip((offs[diff] << 2).tolist(), masks[diff].tolist(), newv[diff].tolist()):
+                print(f"[preflight] set 0x{off:x} |= 0x{mask:08x} -> 0x{v:08x}")
+        return int(diff.sum())
+    finally:
+        del u32v  # release the buffer export before the caller closes mm
+
 def _idx_delta(mm, idx_off, win_ms=60, step_ms=5):
-    start = _u32(mm, idx_off); t0 = time.time()
-    while (time.time()-t0)*1000.0 < win_ms:
+    start = _u32(mm, idx_off); deadline = time.monotonic() + win_ms/1000.0
+    while time.monotonic() < deadline:
         time.sleep(step_ms/1000.0)
     end = _u32(mm, idx_off)
     return (end - start) & 0xFFFFFFFF
@@ -43,18 +65,44 @@ def _score_candidate(mm, off, idx_off, quiet_ms=60, pulse_ms=60):
     best_mode, best_dp = None, -1
     for mode in ("inc32", "mirror", "toggle1"):
         p0 = _u32(mm, idx_off)
-        t0 = time.time(); state=None
-        while (time.time()-t0)*1000.0 < pulse_ms:
+        deadline = time.monotonic() + pulse_ms/1000.0; state=None
+        while time.monotonic() < deadline:
             idx = _u32(mm, idx_off)
             state = _pulse_once(mm, off, idx, mode, state)
         dp = (_u32(mm, idx_off) - p0) & 0xFFFFFFFF
         if dp > best_dp: best_dp, best_mode = dp, mode
     return dq, best_mode, best_dp
 
-def _find_ack(mm, idx_off, ranges, fallback, margin, verbose):
+def _screen_candidates(mm, offs, idx_off, pulse_ms=20, keep=16):
+    """
+    Cheap first pass over a chunk of offsets: each offset gets every pulse mode for about one
+    frame period (~70 ms per offset all in, vs ~190 ms for _score_candidate; a 5 ms dwell is
+    under a 60 fps frame, so Δidx would be 0/1 noise). Returns the `keep` offsets whose best Δ
+    beats the quiet baseline by the most, strongest first.
+    """
+    offs = np.asarray(offs, dtype=np.int64)
+    if len(offs) <= keep:
+        return offs
+    dq = _idx_delta(mm, idx_off, pulse_ms, 5)  # quiet Δidx over the same dwell
+    dps = np.empty(len(offs), dtype=np.int64)
+    dwell = pulse_ms/1000.0
+    for i, off in enumerate(offs.tolist()):
+        best = 0
+        for mode in ("inc32", "mirror", "toggle1"):
+            p0 = _u32(mm, idx_off)
+            deadline = time.monotonic() + dwell; state=None
+            while time.monotonic() < deadline:
+                state = _pulse_once(mm, off, _u32(mm, idx_off), mode, state)
+            best = max(best, (_u32(mm, idx_off) - p0) & 0xFFFFFFFF)
+        dps[i] = best
+    dps -= dq
+    top = np.argpartition(dps, -keep)[-keep:]
+    top = top[np.argsort(-dps[top], kind="stable")]
+    return offs[top]
+
+def _find_ack(mm, idx_off, ranges, fallback, margin, verbose, screen_k=16, screen_chunk=256):
     tried=set()
-    def scan(lst, tag):
-        if verbose: print(f"[scan] {tag}: {len(lst)} dwords")
+    def score(lst):
         for off in lst:
             if off == idx_off or off in tried: continue
             tried.add(off)
@@ -65,12 +113,26 @@ def _find_ack(mm, idx_off, ranges, fallback, margin, verbose):
             if ok: return off, mode
         return None, None
 
+    def scan(lst, tag, screen=False):
+        if verbose: print(f"[scan] {tag}: {len(lst)} dwords")
+        if not screen:
+            return score(lst)
+        # screen chunk by chunk and fully score each chunk's top-K, so a low ACK still exits early;
+        # only screened candidates get a full score, the rest stay untried
+        lst = [o for o in dict.fromkeys(lst) if o != idx_off and o not in tried]
+        for c in range(0, len(lst), screen_chunk):
+            top = _screen_candidates(mm, lst[c:c+screen_chunk], idx_off, keep=screen_k).tolist()
+            if verbose: print(f"[scan] {tag}: 0x{lst[c]:x}.. screened to {len(top)} candidates")
+            off, mode = score(top)
+            if off is not None: return off, mode
+        return None, None
+
     small = [o for (s,e) in ranges for o in range(s,e,4)]
     off, mode = scan(small, "ranges")
     if off is not None: return off, mode
 
     s, e = fallback
-    off, mode = scan(list(range(s, e, 4)), "fallback")
+    off, mode = scan(list(range(s, e, 4)), "fallback", screen=True)
     return off, mode
 
 def warm_boot_and_find_ack(
@@ -95,26 +157,22 @@ def warm_boot_and_find_ack(
         _ensure_connected(mm, flag_off, flag_mask)
 
         # 2) apply stable profile bits (idempotent)
-        applied = 0
-        for off, mask in SET_BITS.items():
-            if off == idx_off:  # never touch the read-index
-                continue
-            cur = _u32(mm, off)
-            newv = cur | (mask & 0xFFFFFFFF)
-            if newv != cur:
-                _p32(mm, off, newv); applied += 1
-                if verbose: print(f"[preflight] set 0x{off:x} |= 0x{mask:08x} -> 0x{newv:08x}")
+        applied = _apply_set_bits(mm, idx_off, verbose)
         if verbose: print(f"[preflight] applied {applied} set-bit writes")
 
-        # 3) find ACK
+        # 3) find ACK (scan pokes scattered header dwords: no readahead wanted)
+        if hasattr(mm, "madvise") and hasattr(mmap, "MADV_RANDOM"):
+            scan_end = max([e for (_, e) in ranges] + [fallback[1]])
+            try: mm.madvise(mmap.MADV_RANDOM, 0, min(st.st_size, scan_end + mmap.PAGESIZE - 1) & ~(mmap.PAGESIZE - 1))
+            except OSError: pass
         ack_off, mode = _find_ack(mm, idx_off, ranges, fallback, margin, verbose)
         if ack_off is None:
             raise RuntimeError("Could not locate ACK; widen fallback or lower margin")
         if verbose: print(f"[preflight] ACK @ 0x{ack_off:x} mode={mode}")
 
         # 4) warm-pump for a moment
-        state=None; end=time.time()+pump_seconds; beats=0
-        while time.time() < end:
+        state=None; end=time.monotonic()+pump_seconds; beats=0
+        while time.monotonic() < end:
             idx = _u32(mm, idx_off)
             state = _pulse_once(mm, ack_off, idx, mode, state)
             beats += 1
@@ -1,5 +1,8 @@
 #!/usr/bin/env python3
-import os, mmap, struct
+import os, mmap, struct, threading, time
+import numpy as np
+
+_U32 = struct.Struct("<I")
 
 class LGMPv6:
     """
@@ -26,17 +29,33 @@ class LGMPv6:
 
         self.force_offset = force_offset
         self.force_slot   = int(force_slot)
+        self._tight_buf   = None
+        self._advise_frames()
+
+    def _advise_frames(self):
+        # frames are read strictly forward: ask for readahead on the slot region (best effort)
+        if not (hasattr(self.mm, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL")):
+            return
+        start = self.slot_offset(0) & ~(mmap.PAGESIZE - 1)  # madvise wants a page-aligned start
+        end   = min(self.size, self.slot_offset(0) + self.pitch * self.fb_h * self.nbuf)
+        if 0 <= start < end:
+            try: self.mm.madvise(mmap.MADV_SEQUENTIAL, start, end - start)
+            except OSError: pass
 
     def close(self):
         try: self.mm.close()
         except: pass
         os.close(self.fd)
 
+    def frame_seq(self):
+        # Producer write index; advances once per published frame regardless of slot layout.
+        return _U32.unpack_from(self.mm, self.idx_off)[0]
+
     def current_slot(self):
         # If forcing an absolute offset, respect --slot and ignore the header index.
         if self.force_offset is not None:
             return self.force_slot
-        idx = struct.unpack_from("<I", self.mm, self.idx_off)[0]
+        idx = _U32.unpack_from(self.mm, self.idx_off)[0]
         return idx % self.nbuf
 
     def slot_offset(self, slot):
@@ -50,19 +69,101 @@ class LGMPv6:
         fsz  = self.pitch * self.fb_h
         return base + slot * fsz
 
+    def _pitched_rows(self, off):
+        # (fb_h, tight) strided view over the mmap; copying it repacks pitched -> tight in one C pass
+        return np.ndarray((self.fb_h, self.fb_w * self.bpp), dtype=np.uint8, buffer=self.mm,
+                          offset=off, strides=(self.pitch, 1))
+
+    def frame_view(self, slot):
+        """Zero-copy (fb_h, fb_w*bpp) view of the slot, pitch left in the strides; None if out of range."""
+        off = self.slot_offset(slot)
+        if off < 0 or off + self.pitch * self.fb_h > self.size:
+            return None
+        return self._pitched_rows(off)
+
     def read_frame_tight(self, slot):
+        """
+        Tight frame as a memoryview: zero-copy over the mmap when pitch is tight, otherwise
+        over an internal staging buffer that is reused (overwritten) by the next call.
+        """
         off = self.slot_offset(slot)
         fsz = self.pitch * self.fb_h
         if off < 0 or off + fsz > self.size:
             return None
         if self.pitch == self.fb_w * self.bpp:
-            return self.mm[off: off + fsz]
-        # repack pitched -> tight
+            return memoryview(self.mm)[off: off + fsz]
+        tight = self.fb_w * self.bpp
+        if self._tight_buf is None or len(self._tight_buf) != tight * self.fb_h:
+            self._tight_buf = bytearray(tight * self.fb_h)
+        self.read_frame_tight_into(slot, self._tight_buf)
+        return memoryview(self._tight_buf)
+
+    def read_frame_tight_into(self, slot, out):
+        """Copy the slot as a tight frame into the preallocated buffer `out`; False if out of range."""
+        off = self.slot_offset(slot)
+        fsz = self.pitch * self.fb_h
+        if off < 0 or off + fsz > self.size:
+            return False
         tight = self.fb_w * self.bpp
-        out = bytearray(self.fb_w * self.fb_h * self.bpp)
-        src = off; dst = 0
-        for _ in range(self.fb_h):
-            out[dst:dst+tight] = self.mm[src:src+tight]
-            src += self.pitch
-            dst += tight
-        return bytes(out)
+        if self.pitch == tight:
+            if hasattr(os, "preadv"):
+                # kernel copy straight into `out`; unlike a slice assignment it drops the GIL
+                with memoryview(out) as dst:
+                    got = 0
+                    while got < fsz:
+                        n = os.preadv(self.fd, [dst[got:fsz]], off + got)
+                        if n <= 0: return False
+                        got += n
+            else:
+                with memoryview(self.mm) as src, memoryview(out) as dst:
+                    dst[:fsz] = src[off: off + fsz]
+        else:
+            dst = np.frombuffer(out, dtype=np.uint8, count=tight * self.fb_h).reshape(self.fb_h, tight)
+            np.copyto(dst, self._pitched_rows(off))
+        return True
+
+
+class FrameReader(threading.Thread):
+    """
+    Copies each new LG frame into a small ring of reusable buffers off the render thread.
+    `latest` is a (seq, buffer) tuple swapped in one assignment, so the GL thread always sees
+    a consistent pair and can skip the upload when seq has not changed.
+    Stop (and join) it before closing the LGMPv6 it reads from.
+    """
+    def __init__(self, lg, nbuf=3, poll_s=0.002, max_poll_s=0.008):
+        super().__init__(daemon=True)
+        self.lg     = lg
+        self.nbuf   = int(nbuf)
+        self.poll_s = float(poll_s)          # poll period right after a new frame
+        self.max_poll_s = max(self.poll_s, float(max_poll_s))  # backed-off period while seq is idle
+        self.latest = (None, None)
+        self._ring  = []
+        self._stop_req = False  # not _stop: that name is a Thread internal
+
+    def stop(self):
+        self._stop_req = True
+
+    def _ensure_ring(self):
+        size = self.lg.fb_w * self.lg.fb_h * self.lg.bpp
+        if not self._ring or len(self._ring[0]) != size:
+            self._ring = [bytearray(size) for _ in range(self.nbuf)]
+
+    def run(self):
+        last = None; i = 0
+        delay = self.poll_s
+        while not self._stop_req:
+            try:
+                seq = self.lg.frame_seq()
+                if seq == last:
+                    delay = min(delay * 2, self.max_poll_s)  # idle guest: back off
+                else:
+                    delay = self.poll_s
+                    self._ensure_ring()
+                    buf = self._ring[i]
+                    if self.lg.read_frame_tight_into(self.lg.current_slot(), buf):
+                        self.latest = (seq, buf)
+                        last = seq
+                        i = (i + 1) % len(self._ring)
+            except Exception:
+                pass
+            time.sleep(delay)
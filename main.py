@@ -10,14 +10,15 @@ from lgmp_profile  import (
     ACK_RANGES_DEFAULT, ACK_FALLBACK_DEFAULT,
 )
 from lgmp_preflight import warm_boot_and_find_ack
-from lgmp_ring     import LGMPv6
+from lgmp_ring     import LGMPv6, FrameReader
 from input_vnc     import VNCInputProxy
 
 from lg_signal_monitor import SignalMonitor4, PredEq, PredNZ, PredOneOf
 
 from gl_viewer import (
-    _build_program, _make_quad, _create_tex, _upload_bgr,
-    VERT_SRC_TEX, FRAG_SRC_TEX
+    _build_program, _uniform_loc, _make_quad, _create_frame_target, _delete_frame_target,
+    _upload_bgr_sub,
+    VERT_SRC_TEX, FRAG_SRC_TEX, SWIZZLE_BGR1
 )
 
 def on_ui_action(action, payload=None):
@@ -31,25 +32,23 @@ def parse_size(s):
     return w, h
 
 # -------- Qt -> X11/VNC keysym map  --------
+# Qt.Key_A..Z are 0x41..0x5A (uppercase ASCII); X11 wants the lowercase keysyms.
+# Qt.Key_0..9 and Qt.Key_Space already equal their keysyms, so they fall through.
+_QT_A, _QT_Z = int(Qt.Key_A), int(Qt.Key_Z)
 QT2X11 = {
-    Qt.Key_A: 0x0061, Qt.Key_B: 0x0062, Qt.Key_C: 0x0063, Qt.Key_D: 0x0064,
-    Qt.Key_E: 0x0065, Qt.Key_F: 0x0066, Qt.Key_G: 0x0067, Qt.Key_H: 0x0068,
-    Qt.Key_I: 0x0069, Qt.Key_J: 0x006A, Qt.Key_K: 0x006B, Qt.Key_L: 0x006C,
-    Qt.Key_M: 0x006D, Qt.Key_N: 0x006E, Qt.Key_O: 0x006F, Qt.Key_P: 0x0070,
-    Qt.Key_Q: 0x0071, Qt.Key_R: 0x0072, Qt.Key_S: 0x0073, Qt.Key_T: 0x0074,
-    Qt.Key_U: 0x0075, Qt.Key_V: 0x0076, Qt.Key_W: 0x0077, Qt.Key_X: 0x0078,
-    Qt.Key_Y: 0x0079, Qt.Key_Z: 0x007A,
-    Qt.Key_0: 0x0030, Qt.Key_1: 0x0031, Qt.Key_2: 0x0032, Qt.Key_3: 0x0033,
-    Qt.Key_4: 0x0034, Qt.Key_5: 0x0035, Qt.Key_6: 0x0036, Qt.Key_7: 0x0037,
-    Qt.Key_8: 0x0038, Qt.Key_9: 0x0039,
-    Qt.Key_Space: 0x0020, Qt.Key_Return: 0xFF0D, Qt.Key_Escape: 0xFF1B,
+    Qt.Key_Return: 0xFF0D, Qt.Key_Escape: 0xFF1B,
     Qt.Key_Backspace: 0xFF08, Qt.Key_Tab: 0xFF09,
     Qt.Key_Left: 0xFF51, Qt.Key_Up: 0xFF52, Qt.Key_Right: 0xFF53, Qt.Key_Down: 0xFF54,
     Qt.Key_F1: 0xFFBE, Qt.Key_F2: 0xFFBF, Qt.Key_F3: 0xFFC0, Qt.Key_F4: 0xFFC1,
     Qt.Key_F5: 0xFFC2, Qt.Key_F6: 0xFFC3, Qt.Key_F7: 0xFFC4, Qt.Key_F8: 0xFFC5,
     Qt.Key_F9: 0xFFC6, Qt.Key_F10: 0xFFC7, Qt.Key_F11: 0xFFC8, Qt.Key_F12: 0xFFC9,
 }
+
 def map_keysym(qt_key):
+    if _QT_A <= qt_key <= _QT_Z:
+        return qt_key + 0x20
+    if qt_key < 0x100:  # digits, space: identity
+        return qt_key
     return QT2X11.get(qt_key, qt_key)
 
 # --- Health monitor ---
@@ -85,7 +84,7 @@ class HealthThread:
     def _loop(self):
         while True:
             time.sleep(0.2)
-            status, reason = self.mon._classify(time.time())
+            status, reason = self.mon._classify(time.monotonic())
             fps = self.mon.fps.rate()
             if self.relaxed and status != "dead" and fps >= self.fps_ok * 0.9:
                 status = "ok"
@@ -98,7 +97,7 @@ class HealthThread:
             self._last_status = status
 
     def status(self):
-        status, reason = self.mon._classify(time.time())
+        status, reason = self.mon._classify(time.monotonic())
         fps = self.mon.fps.rate()
         if self.relaxed and status != "dead" and fps >= self.fps_ok * 0.9:
             return "ok"
@@ -106,16 +105,21 @@ class HealthThread:
 
 # ---- Qt OpenGL widget with direct VNC proxy ----
 class ViewerGL(QGLWidget):
-    def __init__(self, lg, vnc=None, parent=None):
+    def __init__(self, lg, vnc=None, reader=None, parent=None):
         super().__init__(parent)
         self.lg = lg
         self.vnc = vnc
+        self.reader = reader
         self.setFocusPolicy(Qt.StrongFocus)
         self.setMouseTracking(True)
         self.prog = None
         self.vao = None
         self.tex = None
         self.locTex = None
+        self.pbos = None
+        self._frame = 0
+        self._frame_size = None
+        self._last_seq = None
 
     def _to_guest(self, x, y):
         w = max(1, self.width())
@@ -176,16 +180,34 @@ class ViewerGL(QGLWidget):
     def initializeGL(self):
         self.prog = _build_program(VERT_SRC_TEX, FRAG_SRC_TEX)
         self.vao, _, _ = _make_quad(self.prog, flip_y=True)
-        self.tex = _create_tex()
-        self.locTex = GL.glGetUniformLocation(self.prog, "uTex")
+        self._frame_size = (self.lg.fb_w, self.lg.fb_h)
+        self.tex, self.pbos = _create_frame_target(*self._frame_size)
+        self.locTex = _uniform_loc(self.prog, "uTex")
+        GL.glUseProgram(self.prog)
+        GL.glUniform1i(_uniform_loc(self.prog, "uSwizzle"), SWIZZLE_BGR1)
+        GL.glUseProgram(0)
         GL.glClearColor(0, 0, 0, 1)
 
     def paintGL(self):
         try:
-            slot = self.lg.current_slot()
-            data = self.lg.read_frame_tight(slot)
-            if data:
-                _upload_bgr(self.tex, self.lg.fb_w, self.lg.fb_h, data, self.lg.bpp)
+            if self.reader is not None:
+                seq, data = self.reader.latest
+                if seq == self._last_seq:
+                    data = None
+                self._last_seq = seq
+            else:
+                seq = self.lg.frame_seq()
+                # no reader: stage straight from the pitched shm view, one pass into the PBO
+                data = None if seq == self._last_seq else self.lg.frame_view(self.lg.current_slot())
+                self._last_seq = seq
+            if data is not None and (self.lg.fb_w, self.lg.fb_h) != self._frame_size:
+                _delete_frame_target(self.tex, self.pbos)
+                self._frame_size = (self.lg.fb_w, self.lg.fb_h)
+                self.tex, self.pbos = _create_frame_target(*self._frame_size)
+            if data is not None:
+                stage = self.pbos[self._frame % len(self.pbos)]
+                _upload_bgr_sub(self.tex, self.lg.fb_w, self.lg.fb_h, data, self.lg.bpp, stage)
+                self._frame += 1
         except Exception:
             pass
 
@@ -199,11 +221,15 @@ class ViewerGL(QGLWidget):
         GL.glDrawElements(GL.GL_TRIANGLES, 6, GL.GL_UNSIGNED_INT, None)
         GL.glBindVertexArray(0)
 
-        self.update()
+    def frame_seq(self):
+        # what paintGL would upload next; cheap enough to poll from a timer
+        if self.reader is not None:
+            return self.reader.latest[0]
+        return self.lg.frame_seq()
 
 # ---- Main Qt window ----
 class MainWindow(QMainWindow):
-    def __init__(self, args, lg, vnc, health):
+    def __init__(self, args, lg, vnc, health, reader=None):
         super().__init__()
         self.lg = lg
         self.vnc = vnc
@@ -221,7 +247,7 @@ class MainWindow(QMainWindow):
         viewMenu = menubar.addMenu("View")
         viewMenu.addAction(QAction("Fullscreen", self, triggered=lambda: on_ui_action("fullscreen_toggle")))
 
-        self.viewer = ViewerGL(lg, vnc)
+        self.viewer = ViewerGL(lg, vnc, reader)
         self.setCentralWidget(self.viewer)
 
         self._sb = self.statusBar()
@@ -229,6 +255,22 @@ class MainWindow(QMainWindow):
         self._timer.timeout.connect(self._tick_statusbar)
         self._timer.start(500)
 
+        # repaint only when the producer has published a new frame (~120 Hz check)
+        self._last_idx = -1
+        self._frame_timer = QTimer(self)
+        self._frame_timer.setTimerType(Qt.PreciseTimer)
+        self._frame_timer.timeout.connect(self._tick_frame)
+        self._frame_timer.start(8)
+
+    def _tick_frame(self):
+        try:
+            seq = self.viewer.frame_seq()
+        except Exception:
+            return
+        if seq != self._last_idx:
+            self._last_idx = seq
+            self.viewer.update()
+
     def _tick_statusbar(self):
         try:
             status = self.health.status()
@@ -262,6 +304,8 @@ def main():
     ap.add_argument("--vnc-scale-x", type=float, default=1.0)
     ap.add_argument("--vnc-scale-y", type=float, default=1.0)
     ap.add_argument("--no-input", action="store_true")
+    ap.add_argument("--direct-upload", action="store_true",
+                    help="no FrameReader thread: copy straight from shm into the PBO (one pass; may tear)")
 
     args = ap.parse_args()
 
@@ -317,12 +361,19 @@ def main():
                           relaxed=args.health_relaxed or True)
     health.start()
 
+    reader = None
+    if not args.direct_upload:
+        reader = FrameReader(lg)
+        reader.start()
+
     app = QApplication(sys.argv)
-    win = MainWindow(args, lg, vnc, health)
+    win = MainWindow(args, lg, vnc, health, reader)
     win.show()
     try:
         sys.exit(app.exec_())
     finally:
+        if reader:
+            reader.stop(); reader.join(0.5)
         try: lg.close()
         except Exception: pass
         if vnc: vnc.stop()